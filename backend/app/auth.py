@@ -1,7 +1,7 @@
 from datetime import datetime, timedelta
 from typing import Optional
 import os
-from jose import JWTError, jwt
+from jose import JWTError, jwk, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
@@ -10,6 +10,14 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Build the key objects once; handing jose a raw string makes it re-parse the key
+# on every encode/decode. For RS*/ES* deployments SECRET_KEY holds the private PEM
+# and JWT_PUBLIC_KEY the public PEM used for verification.
+_SIGNING_KEY = jwk.construct(SECRET_KEY, ALGORITHM)
+_JWT_PUBLIC_KEY = os.getenv("JWT_PUBLIC_KEY")
+_VERIFY_KEY = jwk.construct(_JWT_PUBLIC_KEY, ALGORITHM) if _JWT_PUBLIC_KEY else _SIGNING_KEY
+_ALGORITHMS = [ALGORITHM]
+
 security = HTTPBearer()
 
 
@@ -21,12 +29,16 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, _SIGNING_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
-    """Verify JWT token and return payload"""
+async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+    """
+    Verify JWT token and return payload.
+    Declared async: an HMAC check takes microseconds, far less than a threadpool hop.
+    FastAPI caches dependencies per request, so this runs at most once per request.
+    """
     token = credentials.credentials
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -34,7 +46,7 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security))
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, _VERIFY_KEY, algorithms=_ALGORITHMS)
         user_id: int = payload.get("sub")
         if user_id is None:
             raise credentials_exception
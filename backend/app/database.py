@@ -2,17 +2,136 @@
 Database implementation using SQLAlchemy
 Supports both PostgreSQL and SQLite
 """
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, func
+from sqlalchemy import BigInteger, desc, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
 from app.db_models import User as DBUser, Score as DBScore, GameModeEnum
-from app.db_config import get_db_session, init_db
+from app.db_config import init_db, session_scope
 from app.models import GameMode
-from passlib.context import CryptContext
 from datetime import datetime
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHash, VerificationError
+import bcrypt
+import os
+import threading
+import time
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing: argon2id for new hashes; bcrypt hashes from older releases are
+# still verified and upgraded on the next successful login.
+# Cost parameters are read from environment; defaults follow OWASP's interactive-login
+# guidance (19 MiB, 2 iterations). Lower them only for tests/dev.
+# No server-side pepper: PasswordHasher takes no secret, a pre-hashed pepper could
+# not be rotated without locking out every user, and hashes stored without one
+# could not be told apart from peppered ones.
+password_hasher = PasswordHasher(
+    time_cost=int(os.getenv("ARGON2_TIME_COST", "2")),
+    memory_cost=int(os.getenv("ARGON2_MEMORY_COST", "19456")),  # KiB
+    parallelism=1,
+)
+
+# API GameMode -> database mode code. Plain ints: some DB drivers render an
+# IntEnum by its str(), which is the member name on Python < 3.11
+_MODE_MAP = {
+    GameMode.WALL: int(GameModeEnum.WALL),
+    GameMode.PASS: int(GameModeEnum.PASS),
+}
+
+# Database mode code -> API mode string; keyed by the raw SMALLINT read from each row
+_MODE_STR = {int(mode): mode.name.lower() for mode in GameModeEnum}
+
+
+class epoch_ms(FunctionElement):
+    """Milliseconds since the Unix epoch for a naive UTC DateTime, computed by the database"""
+    type = BigInteger()
+    inherit_cache = True
+
+
+@compiles(epoch_ms)
+def _epoch_ms_postgresql(element, compiler, **kw):
+    column = compiler.process(element.clauses, **kw)
+    return f"CAST(FLOOR(EXTRACT(EPOCH FROM {column}) * 1000) AS BIGINT)"
+
+
+@compiles(epoch_ms, "sqlite")
+def _epoch_ms_sqlite(element, compiler, **kw):
+    # SQLite has no EXTRACT and its strftime rounds sub-second values, so split the
+    # stored 'YYYY-MM-DD HH:MM:SS.ffffff' string into whole seconds + millisecond digits
+    column = compiler.process(element.clauses, **kw)
+    return (
+        f"(CAST(strftime('%s', substr({column}, 1, 19)) AS INTEGER) * 1000"
+        f" + CAST(substr({column}, 21, 3) AS INTEGER))"
+    )
+
+
+def _bcrypt_safe(password: str) -> bytes:
+    """
+    Encode a password for bcrypt, which only looks at the first 72 bytes.
+    Anything over 70 bytes is cut to at most 70 bytes on a character boundary,
+    matching how existing hashes were produced (71- and 72-byte passwords included).
+    """
+    if not isinstance(password, str):
+        password = str(password)
+    pwd_bytes = password.encode('utf-8', 'ignore')
+    if len(pwd_bytes) <= 70:
+        return pwd_bytes
+    
+    # Drop the character that straddles the cut (continuation bytes + lead byte)
+    end = 70
+    while end and (pwd_bytes[end - 1] & 0xC0) == 0x80:
+        end -= 1
+    if end and pwd_bytes[end - 1] >= 0xC0:
+        end -= 1
+    return pwd_bytes[:end]
+
+
+class _TTLCache:
+    """
+    Minimal thread-safe, time-bounded cache.
+    The oldest entry is evicted once maxsize is reached.
+    """
+    
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: Dict[Any, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key: Any) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+    
+    def set(self, key: Any, value: Any) -> None:
+        with self._lock:
+            if key not in self._data and len(self._data) >= self.maxsize:
+                del self._data[next(iter(self._data))]
+            self._data[key] = (time.monotonic() + self.ttl, value)
+    
+    def pop(self, key: Any) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+# User rows looked up on every authenticated request. The only in-place update is
+# a password rehash (which invalidates locally), so a short TTL bounds staleness.
+_user_cache = _TTLCache(maxsize=10_000, ttl=60)
+
+# Leaderboard pages keyed by (limit, mode). Score writes on this process clear it;
+# writes on other replicas show up within the TTL.
+_leaderboard_cache = _TTLCache(maxsize=512, ttl=10)
 
 
 class Database:
@@ -30,147 +149,108 @@ class Database:
             except Exception as e:
                 print(f"Warning: Failed to initialize test data: {e}")
     
-    def _truncate_password(self, password: str) -> str:
-        """Helper to truncate password to 72 bytes safely for bcrypt"""
-        if not isinstance(password, str):
-            password = str(password)
-        
-        password_bytes = password.encode('utf-8')
-        
-        if len(password_bytes) <= 72:
-            return password
-        
-        # Truncate to 70 bytes (safe margin)
-        max_bytes = 70
-        truncated_bytes = password_bytes[:max_bytes]
-        
-        # Remove incomplete UTF-8 sequences
-        while truncated_bytes and (truncated_bytes[-1] & 0b11000000) == 0b10000000:
-            truncated_bytes = truncated_bytes[:-1]
-            if len(truncated_bytes) == 0:
-                truncated_bytes = password_bytes[:1]
-                break
-        
-        result = truncated_bytes.decode('utf-8', errors='ignore')
-        
-        # Final verification
-        while len(result.encode('utf-8')) > 72 and len(result) > 0:
-            result = result[:-1]
-        
-        return result
-    
     def hash_password(self, password: str) -> str:
-        """Hash a password (bcrypt has 72 byte limit)"""
-        password = self._truncate_password(password)
-        
-        # Final check
-        password_bytes = password.encode('utf-8')
-        if len(password_bytes) > 70:
-            password_bytes = password_bytes[:70]
-            while password_bytes and (password_bytes[-1] & 0b11000000) == 0b10000000:
-                password_bytes = password_bytes[:-1]
-            password = password_bytes.decode('utf-8', errors='ignore')
-        
-        while True:
-            pwd_bytes = password.encode('utf-8')
-            if len(pwd_bytes) <= 72:
-                break
-            if len(password) > 0:
-                password = password[:-1]
-            else:
-                password = "a"
-                break
-        
-        final_pwd_bytes = password.encode('utf-8')
-        if len(final_pwd_bytes) > 72:
-            password = final_pwd_bytes[:70].decode('utf-8', errors='ignore')
-            while len(password.encode('utf-8')) > 72 and len(password) > 0:
-                password = password[:-1]
-        
-        try:
-            return pwd_context.hash(password)
-        except ValueError as e:
-            if "72 bytes" in str(e):
-                password = password.encode('utf-8')[:70].decode('utf-8', errors='ignore')
-                while password.encode('utf-8') and (password.encode('utf-8')[-1] & 0b11000000) == 0b10000000:
-                    password = password[:-1]
-                return pwd_context.hash(password)
-            raise
+        """Hash a password with argon2id"""
+        return password_hasher.hash(password)
     
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        """Verify a password against its hash"""
-        plain_password = self._truncate_password(plain_password)
-        
-        # Final check
-        password_bytes = plain_password.encode('utf-8')
-        if len(password_bytes) > 70:
-            password_bytes = password_bytes[:70]
-            while password_bytes and (password_bytes[-1] & 0b11000000) == 0b10000000:
-                password_bytes = password_bytes[:-1]
-            plain_password = password_bytes.decode('utf-8', errors='ignore')
-        
-        while True:
-            pwd_bytes = plain_password.encode('utf-8')
-            if len(pwd_bytes) <= 72:
-                break
-            if len(plain_password) > 0:
-                plain_password = plain_password[:-1]
-            else:
-                plain_password = "a"
-                break
-        
-        final_pwd_bytes = plain_password.encode('utf-8')
-        if len(final_pwd_bytes) > 72:
-            plain_password = final_pwd_bytes[:70].decode('utf-8', errors='ignore')
-            while len(plain_password.encode('utf-8')) > 72 and len(plain_password) > 0:
-                plain_password = plain_password[:-1]
-        
+        """Verify a password against its argon2id or legacy bcrypt hash"""
+        if not hashed_password.startswith("$argon2"):
+            # Legacy bcrypt hash (bcrypt has 72 byte limit)
+            try:
+                return bcrypt.checkpw(_bcrypt_safe(plain_password), hashed_password.encode('utf-8'))
+            except ValueError:  # empty or corrupt hash ("Invalid salt")
+                return False
         try:
-            return pwd_context.verify(plain_password, hashed_password)
-        except ValueError as e:
-            if "72 bytes" in str(e):
-                plain_password = plain_password.encode('utf-8')[:70].decode('utf-8', errors='ignore')
-                while plain_password.encode('utf-8') and (plain_password.encode('utf-8')[-1] & 0b11000000) == 0b10000000:
-                    plain_password = plain_password[:-1]
-                return pwd_context.verify(plain_password, hashed_password)
-            raise
+            return password_hasher.verify(hashed_password, plain_password)
+        except (VerificationError, InvalidHash):
+            # VerificationError covers a wrong password and a hash argon2 cannot decode
+            return False
     
-    def create_user(self, username: str, email: str, password: str) -> int:
-        """Create a new user and return user ID"""
-        db = get_db_session()
-        try:
-            user = DBUser(
-                username=username,
-                email=email,
-                password_hash=self.hash_password(password)
-            )
-            db.add(user)
+    def password_needs_rehash(self, hashed_password: str) -> bool:
+        """Check if a hash is legacy bcrypt or uses outdated argon2 parameters"""
+        if not hashed_password.startswith("$argon2"):
+            return True
+        return password_hasher.check_needs_rehash(hashed_password)
+    
+    def update_password_hash(self, user_id: int, password_hash: str) -> None:
+        """Replace a user's stored password hash"""
+        with session_scope() as db:
+            username = db.execute(
+                update(DBUser).where(DBUser.id == user_id)
+                .values(password_hash=password_hash)
+                .returning(DBUser.username)
+            ).scalar_one_or_none()
+            db.commit()
+        _user_cache.pop(("id", user_id))
+        _user_cache.pop(("username", username))
+    
+    def create_user(self, username: str, email: str, password: str,
+                    password_hash: Optional[str] = None) -> int:
+        """
+        Create a new user and return user ID.
+        Pass a precomputed password_hash to skip bcrypt (e.g. when seeding data).
+        """
+        # Hash before checking out a connection so bcrypt doesn't hold one
+        password_hash = password_hash or self.hash_password(password)
+        with session_scope() as db:
+            # INSERT ... RETURNING gets the new id without a follow-up SELECT
+            user_id = db.execute(
+                insert(DBUser).values(
+                    username=username,
+                    email=email,
+                    password_hash=password_hash
+                ).returning(DBUser.id)
+            ).scalar_one()
+            db.commit()
+        _user_cache.pop(("id", user_id))
+        _user_cache.pop(("username", username))
+        return user_id
+    
+    def create_user_if_unique(self, username: str, email: str, password: str) -> Optional[dict]:
+        """
+        Create a new user in a single INSERT ... ON CONFLICT DO NOTHING RETURNING.
+        Returns the new user (id, username, email), or None if the email or
+        username is already taken.
+        """
+        password_hash = self.hash_password(password)
+        with session_scope() as db:
+            dialect_insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+            row = db.execute(
+                dialect_insert(DBUser).values(
+                    username=username,
+                    email=email,
+                    password_hash=password_hash
+                ).on_conflict_do_nothing().returning(DBUser.id, DBUser.username, DBUser.email)
+            ).first()
             db.commit()
-            db.refresh(user)
-            return user.id
-        finally:
-            db.close()
+        if row is None:
+            return None
+        _user_cache.pop(("id", row.id))
+        _user_cache.pop(("username", row.username))
+        return {"id": row.id, "username": row.username, "email": row.email}
     
     def get_user_by_id(self, user_id: int) -> Optional[dict]:
-        """Get user by ID"""
-        db = get_db_session()
-        try:
+        """Get user by ID (cached)"""
+        cached = _user_cache.get(("id", user_id))
+        if cached is not None:
+            return dict(cached)
+        with session_scope() as db:
             user = db.query(DBUser).filter(DBUser.id == user_id).first()
             if not user:
                 return None
-            return {
+            user_dict = {
                 "id": user.id,
                 "username": user.username,
                 "email": user.email,
                 "password_hash": user.password_hash
             }
-        finally:
-            db.close()
+        _user_cache.set(("id", user_id), user_dict)
+        return dict(user_dict)
     
     def get_user_by_email(self, email: str) -> Optional[dict]:
         """Get user by email"""
-        db = get_db_session()
-        try:
+        with session_scope() as db:
             user = db.query(DBUser).filter(DBUser.email == email).first()
             if not user:
                 return None
@@ -180,81 +260,116 @@ class Database:
                 "email": user.email,
                 "password_hash": user.password_hash
             }
-        finally:
-            db.close()
     
     def get_user_by_username(self, username: str) -> Optional[dict]:
-        """Get user by username"""
-        db = get_db_session()
-        try:
+        """Get user by username (cached)"""
+        cached = _user_cache.get(("username", username))
+        if cached is not None:
+            return dict(cached)
+        with session_scope() as db:
             user = db.query(DBUser).filter(DBUser.username == username).first()
             if not user:
                 return None
-            return {
+            user_dict = {
                 "id": user.id,
                 "username": user.username,
                 "email": user.email,
                 "password_hash": user.password_hash
             }
-        finally:
-            db.close()
+        _user_cache.set(("username", username), user_dict)
+        return dict(user_dict)
+    
+    def clear_caches(self):
+        """Drop all cached user rows and leaderboards (e.g. after swapping the underlying database)"""
+        _user_cache.clear()
+        _leaderboard_cache.clear()
     
     def email_exists(self, email: str) -> bool:
         """Check if email already exists"""
-        db = get_db_session()
-        try:
-            return db.query(DBUser).filter(DBUser.email == email).first() is not None
-        finally:
-            db.close()
+        with session_scope() as db:
+            return db.query(db.query(DBUser.id).filter(DBUser.email == email).exists()).scalar()
     
     def username_exists(self, username: str) -> bool:
         """Check if username already exists"""
-        db = get_db_session()
-        try:
-            return db.query(DBUser).filter(DBUser.username == username).first() is not None
-        finally:
-            db.close()
+        with session_scope() as db:
+            return db.query(db.query(DBUser.id).filter(DBUser.username == username).exists()).scalar()
     
-    def create_score(self, user_id: int, score: int, mode: GameMode, timestamp: Optional[datetime] = None) -> int:
-        """Create a new score entry"""
-        db = get_db_session()
-        try:
-            # Convert GameMode enum to GameModeEnum
-            mode_enum = GameModeEnum.WALL if mode == GameMode.WALL else GameModeEnum.PASS
-            
-            score_entry = DBScore(
-                user_id=user_id,
-                score=score,
-                mode=mode_enum,
-                timestamp=timestamp or datetime.utcnow()
-            )
-            db.add(score_entry)
+    def create_score(self, user_id: int, score: int, mode: GameMode, timestamp: Optional[datetime] = None) -> dict:
+        """Create a new score entry and return it (without rank)"""
+        with session_scope() as db:
+            # RETURNING hands back the generated values, so the row needn't be re-read
+            # and the database stamps the timestamp unless one is given
+            values = {"user_id": user_id, "score": score, "mode": _MODE_MAP[mode]}
+            if timestamp is not None:
+                values["timestamp"] = timestamp
+            score_id, timestamp_ms = db.execute(
+                insert(DBScore).values(**values).returning(DBScore.id, epoch_ms(DBScore.timestamp))
+            ).one()
+            db.commit()
+        _leaderboard_cache.clear()
+        
+        # Username comes from the (usually cached) user row rather than a join
+        user = self.get_user_by_id(user_id)
+        return {
+            "id": score_id,
+            "userId": user_id,
+            "username": user["username"] if user else "",
+            "score": score,
+            "mode": _MODE_STR[_MODE_MAP[mode]],
+            "timestamp": timestamp_ms
+        }
+    
+    def bulk_create_scores(self, rows: List[dict]) -> None:
+        """
+        Insert many scores in a single statement and transaction.
+        Each row needs user_id, score and mode; timestamp is optional.
+        """
+        if not rows:
+            return
+        values = [{
+            "user_id": row["user_id"],
+            "score": row["score"],
+            "mode": _MODE_MAP[row["mode"]]
+        } for row in rows]
+        # executemany needs the same keys in every row: leave timestamp to the
+        # database unless a caller supplied one, then fill the gaps with now
+        if any(row.get("timestamp") for row in rows):
+            now = datetime.utcnow()
+            for value, row in zip(values, rows):
+                value["timestamp"] = row.get("timestamp") or now
+        with session_scope() as db:
+            db.execute(insert(DBScore), values)
             db.commit()
-            db.refresh(score_entry)
-            return score_entry.id
-        finally:
-            db.close()
+        _leaderboard_cache.clear()
     
     def get_scores(self, limit: Optional[int] = None, mode: Optional[GameMode] = None) -> List[dict]:
-        """Get scores, optionally filtered by mode and limited"""
-        db = get_db_session()
-        try:
+        """Get scores, optionally filtered by mode and limited (cached briefly)"""
+        cache_key = (limit, _MODE_MAP[mode] if mode else None)
+        cached = _leaderboard_cache.get(cache_key)
+        if cached is not None:
+            return [dict(s) for s in cached]
+        
+        with session_scope() as db:
+            # Rank is computed by the database; ties are broken by insertion order
+            ordering = (desc(DBScore.score), DBScore.id)
+            rank = func.row_number().over(order_by=ordering).label("rank")
+            
             query = db.query(
                 DBScore.id,
                 DBScore.user_id,
                 DBUser.username,
                 DBScore.score,
                 DBScore.mode,
-                DBScore.timestamp
+                epoch_ms(DBScore.timestamp),
+                rank
             ).join(DBUser, DBScore.user_id == DBUser.id)
             
             # Filter by mode if provided
             if mode:
-                mode_enum = GameModeEnum.WALL if mode == GameMode.WALL else GameModeEnum.PASS
-                query = query.filter(DBScore.mode == mode_enum)
+                query = query.filter(DBScore.mode == _MODE_MAP[mode])
             
-            # Order by score descending
-            query = query.order_by(desc(DBScore.score))
+            # Order by score descending (same ordering as the rank window)
+            query = query.order_by(*ordering)
             
             # Apply limit
             if limit:
@@ -262,35 +377,36 @@ class Database:
             
             results = query.all()
             
-            # Convert to dict format with rank
+            # Convert to dict format
             scores = []
-            for idx, (score_id, user_id, username, score_val, mode_val, timestamp) in enumerate(results, 1):
+            for score_id, user_id, username, score_val, mode_val, timestamp, rank_val in results:
                 scores.append({
                     "id": score_id,
                     "userId": user_id,
                     "username": username,
                     "score": score_val,
-                    "mode": mode_val.value,  # Convert enum to string
-                    "timestamp": int(timestamp.timestamp() * 1000),  # Convert to milliseconds
-                    "rank": idx
+                    "mode": _MODE_STR[mode_val],
+                    "timestamp": timestamp,  # Already milliseconds
+                    "rank": rank_val
                 })
-            
-            return scores
-        finally:
-            db.close()
+        
+        _leaderboard_cache.set(cache_key, scores)
+        return [dict(s) for s in scores]
     
     def get_score_by_id(self, score_id: int) -> Optional[dict]:
         """Get a score by its ID"""
-        db = get_db_session()
-        try:
-            score = db.query(
-                DBScore.id,
-                DBScore.user_id,
-                DBUser.username,
-                DBScore.score,
-                DBScore.mode,
-                DBScore.timestamp
-            ).join(DBUser, DBScore.user_id == DBUser.id).filter(DBScore.id == score_id).first()
+        with session_scope() as db:
+            # Plain Core select: a point lookup needs no ORM identity-map bookkeeping
+            score = db.execute(
+                select(
+                    DBScore.id,
+                    DBScore.user_id,
+                    DBUser.username,
+                    DBScore.score,
+                    DBScore.mode,
+                    epoch_ms(DBScore.timestamp)
+                ).join(DBUser, DBScore.user_id == DBUser.id).where(DBScore.id == score_id)
+            ).first()
             
             if not score:
                 return None
@@ -301,28 +417,34 @@ class Database:
                 "userId": user_id,
                 "username": username,
                 "score": score_val,
-                "mode": mode_val.value,
-                "timestamp": int(timestamp.timestamp() * 1000)
+                "mode": _MODE_STR[mode_val],
+                "timestamp": timestamp
             }
-        finally:
-            db.close()
     
     def get_user_scores(self, user_id: int) -> List[dict]:
         """Get all scores for a specific user"""
-        db = get_db_session()
-        try:
-            scores = db.query(DBScore).filter(DBScore.user_id == user_id).order_by(desc(DBScore.timestamp)).all()
+        with session_scope() as db:
+            # Fetch plain rows in batches instead of materializing ORM objects all at once
+            rows = db.execute(
+                select(
+                    DBScore.id,
+                    DBScore.user_id,
+                    DBScore.score,
+                    DBScore.mode,
+                    epoch_ms(DBScore.timestamp)
+                ).where(DBScore.user_id == user_id)
+                .order_by(desc(DBScore.timestamp))
+                .execution_options(yield_per=1000)
+            )
             
             return [{
-                "id": score.id,
-                "userId": score.user_id,
+                "id": score_id,
+                "userId": score_user_id,
                 "username": "",  # Will be filled if needed
-                "score": score.score,
-                "mode": score.mode.value,
-                "timestamp": int(score.timestamp.timestamp() * 1000)
-            } for score in scores]
-        finally:
-            db.close()
+                "score": score_val,
+                "mode": _MODE_STR[mode_val],
+                "timestamp": timestamp
+            } for score_id, score_user_id, score_val, mode_val, timestamp in rows]
     
     def _initialize_test_data(self):
         """Initialize database with test data (currently disabled)"""
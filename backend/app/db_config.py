@@ -2,12 +2,14 @@
 Database configuration and session management
 Supports both PostgreSQL and SQLite
 """
-from sqlalchemy import create_engine
+from sqlalchemy import Integer, create_engine, event, inspect, text
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import StaticPool
-from app.db_models import Base
+from sqlalchemy.pool import NullPool, QueuePool, StaticPool
+from app.db_models import Base, Score, User
 import os
-from typing import Generator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import AsyncGenerator, Iterator, Optional
 
 # Get database configuration from environment variables
 # Support both individual variables and DATABASE_URL for backward compatibility
@@ -35,48 +37,215 @@ DATABASE_URL = get_database_url()
 # Determine if we're using SQLite
 IS_SQLITE = DATABASE_URL.startswith("sqlite")
 
+# libpq TCP keepalives: notice a dead server or dropped NAT/LB mapping within about a
+# minute instead of the kernel's 2-hour default, so requests fail fast and reconnect
+PG_KEEPALIVE_ARGS = {
+    "keepalives": 1,
+    "keepalives_idle": 30,
+    "keepalives_interval": 10,
+    "keepalives_count": 3,
+    "tcp_user_timeout": 10000,  # ms; unacknowledged writes give up as well
+}
+
 # Engine configuration
 if IS_SQLITE:
     # SQLite-specific configuration
+    # Routes run in FastAPI's threadpool, so file databases get a connection per
+    # thread; only an in-memory database must share a single connection.
     engine = create_engine(
         DATABASE_URL,
         connect_args={"check_same_thread": False},  # Needed for SQLite
-        poolclass=StaticPool,  # SQLite doesn't support connection pooling
+        poolclass=StaticPool if ":memory:" in DATABASE_URL else None,
+        echo=False,  # Set to True for SQL query logging
+    )
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """
+        WAL + synchronous=NORMAL: commits append to the log instead of fsyncing the db file.
+        foreign_keys: SQLite only enforces foreign keys (and ON DELETE CASCADE) when asked to.
+        """
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.execute("PRAGMA journal_mode=WAL")  # stays "memory" for :memory: databases
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")  # 256 MiB
+        cursor.close()
+elif os.getenv("USE_PGBOUNCER", "").lower() in ("1", "true", "yes"):
+    # PostgreSQL behind PgBouncer (transaction mode) - let PgBouncer do the pooling
+    engine = create_engine(
+        DATABASE_URL,
+        poolclass=NullPool,
+        connect_args=PG_KEEPALIVE_ARGS,
         echo=False,  # Set to True for SQL query logging
     )
 else:
-    # PostgreSQL configuration
+    # PostgreSQL configuration with an explicitly sized pool
     engine = create_engine(
         DATABASE_URL,
+        poolclass=QueuePool,
+        pool_size=int(os.getenv("DB_POOL_SIZE", "20")),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        pool_recycle=1800,  # Recycle connections before server/LB idle timeouts
         pool_pre_ping=True,  # Verify connections before using
+        connect_args=PG_KEEPALIVE_ARGS,
         echo=False,  # Set to True for SQL query logging
     )
 
 # Session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False keeps loaded attributes usable after commit without a reload query
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 
 def init_db():
-    """Initialize database - create all tables"""
+    """Initialize database - create all tables and upgrade ones made by older releases"""
     Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
 
 
-def get_db() -> Generator[Session, None, None]:
+def upgrade_schema(bind):
+    """
+    Bring tables created by older releases up to the current schema; safe to run repeatedly.
+    Existing tables may lack:
+    - ON DELETE CASCADE on scores.user_id, which User.scores (passive_deletes) relies on
+    - the server defaults of users.created_at and scores.timestamp, which inserts rely on
+    - the SMALLINT scores.mode; it used to be an enum holding the names 'WALL'/'PASS'
+    """
+    inspector = inspect(bind)
+    statements = []  # PostgreSQL alters tables in place
+    rebuild = {}  # SQLite cannot: table -> {column: SQL converting its old value}
+    
+    user_fks = [fk for fk in inspector.get_foreign_keys("scores") if fk["referred_table"] == "users"]
+    if not any(fk["options"].get("ondelete", "").upper() == "CASCADE" for fk in user_fks):
+        statements += [f'ALTER TABLE scores DROP CONSTRAINT "{fk["name"]}"' for fk in user_fks]
+        statements.append(
+            "ALTER TABLE scores ADD CONSTRAINT scores_user_id_fkey "
+            "FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE"
+        )
+        rebuild.setdefault(Score.__table__, {})
+    
+    for column in (User.__table__.c.created_at, Score.__table__.c.timestamp):
+        reflected = next(col for col in inspector.get_columns(column.table.name) if col["name"] == column.name)
+        if reflected["default"] is None:
+            default = column.server_default.arg.compile(dialect=bind.dialect)
+            statements.append(f"ALTER TABLE {column.table.name} ALTER COLUMN {column.name} SET DEFAULT {default}")
+            rebuild.setdefault(column.table, {})
+    
+    mode = next(col for col in inspector.get_columns("scores") if col["name"] == "mode")
+    if not isinstance(mode["type"], Integer):
+        # Unknown values become NULL and abort the conversion rather than being guessed
+        statements += [
+            "ALTER TABLE scores ALTER COLUMN mode TYPE SMALLINT "
+            "USING CASE mode::text WHEN 'WALL' THEN 0 WHEN 'PASS' THEN 1 END",
+            "DROP TYPE IF EXISTS gamemodeenum",
+        ]
+        rebuild.setdefault(Score.__table__, {})["mode"] = "CASE mode WHEN 'WALL' THEN 0 WHEN 'PASS' THEN 1 END"
+    
+    if bind.dialect.name == "sqlite":
+        for table, converters in rebuild.items():
+            _rebuild_sqlite_table(bind, table, converters)
+    elif statements:
+        with bind.begin() as conn:
+            for statement in statements:
+                conn.execute(text(statement))
+    # create_all skips existing tables, so indexes added since they were made are created here
+    for index in Score.__table__.indexes:
+        index.create(bind, checkfirst=True)
+
+
+def _rebuild_sqlite_table(bind, table, converters):
+    """
+    SQLite cannot change a column or constraint in place: copy the table into a new one.
+    converters maps a column name to the SQL that converts its old value.
+    """
+    legacy = f"{table.name}_legacy"
+    with bind.connect() as conn:
+        # Outside a transaction, where SQLite honours them: dropping the old table must
+        # neither cascade nor fail, and other tables' REFERENCES must keep the table name
+        # instead of following the rename
+        foreign_keys = conn.exec_driver_sql("PRAGMA foreign_keys").scalar()
+        conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        conn.exec_driver_sql("PRAGMA legacy_alter_table=ON")
+        try:
+            # pysqlite does not open a transaction for DDL by itself
+            conn.exec_driver_sql("BEGIN")
+            conn.exec_driver_sql(f'ALTER TABLE "{table.name}" RENAME TO "{legacy}"')
+            # Indexes follow the renamed table and would clash with the new table's names
+            legacy_indexes = conn.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+                (legacy,)
+            ).scalars().all()
+            for name in legacy_indexes:
+                conn.exec_driver_sql(f'DROP INDEX "{name}"')
+            old_columns = {row[1] for row in conn.exec_driver_sql(f'PRAGMA table_info("{legacy}")')}
+            table.create(conn)
+            columns = [column.name for column in table.columns if column.name in old_columns]
+            conn.exec_driver_sql(
+                f'INSERT INTO "{table.name}" ({", ".join(columns)}) '
+                f'SELECT {", ".join(converters.get(name, name) for name in columns)} FROM "{legacy}"'
+            )
+            conn.exec_driver_sql(f'DROP TABLE "{legacy}"')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.exec_driver_sql("PRAGMA legacy_alter_table=OFF")
+            conn.exec_driver_sql(f"PRAGMA foreign_keys={'ON' if foreign_keys else 'OFF'}")
+
+
+def check_db_connection():
+    """Run a trivial query so a bad DATABASE_URL fails at startup, not on the first request"""
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
+def dispose_engine():
+    """Close all pooled connections (on application shutdown)"""
+    engine.dispose()
+
+
+# Session shared by all database work done while handling one request (set by get_db)
+ctx_session: ContextVar[Optional[Session]] = ContextVar("ctx_session", default=None)
+
+
+async def get_db() -> AsyncGenerator[Session, None]:
     """
     Dependency function to get database session.
     Use this in FastAPI route dependencies.
+    The session is also published in ctx_session so every Database call made
+    during the request reuses it. It is declared async so the ContextVar is set
+    in the request's own context, which sync route handlers run in a copy of.
     """
     db = SessionLocal()
+    token = ctx_session.set(db)
     try:
         yield db
     finally:
+        ctx_session.reset(token)
         db.close()
 
 
 def get_db_session() -> Session:
     """
     Get a database session directly (for use outside of FastAPI routes).
-    Remember to close it when done: db.close()
+    Use it as a context manager so it is closed when done:
+        with get_db_session() as db: ...
     """
     return SessionLocal()
 
+
+@contextmanager
+def session_scope() -> Iterator[Session]:
+    """
+    Session for a unit of database work: the current request's session when
+    called inside a request (see get_db), otherwise a fresh one closed afterwards.
+    """
+    db = ctx_session.get()
+    if db is not None:
+        yield db
+    else:
+        with get_db_session() as db:
+            yield db
+
@@ -1,17 +1,36 @@
 """
 SQLAlchemy database models
 """
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, SmallInteger, String, DateTime, ForeignKey, Index
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import declarative_base, relationship
-from datetime import datetime
+from sqlalchemy.sql.expression import FunctionElement
 import enum
 
 Base = declarative_base()
 
 
-class GameModeEnum(str, enum.Enum):
-    WALL = "wall"
-    PASS = "pass"
+class utc_now(FunctionElement):
+    """Current UTC time as a naive timestamp, stamped by the database on insert"""
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(utc_now)
+def _utc_now_postgresql(element, compiler, **kw):
+    return "timezone('utc', now())"
+
+
+@compiles(utc_now, "sqlite")
+def _utc_now_sqlite(element, compiler, **kw):
+    # CURRENT_TIMESTAMP only has whole seconds; keep milliseconds for ordering and epoch_ms
+    return "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+
+class GameModeEnum(enum.IntEnum):
+    """Stored game mode codes (scores.mode is a SMALLINT); values must never be renumbered"""
+    WALL = 0
+    PASS = 1
 
 
 class User(Base):
@@ -21,21 +40,31 @@ class User(Base):
     username = Column(String(50), unique=True, nullable=False, index=True)
     email = Column(String(255), unique=True, nullable=False, index=True)
     password_hash = Column(String(255), nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime, server_default=utc_now(), nullable=False)
 
     # Relationship to scores
-    scores = relationship("Score", back_populates="user", cascade="all, delete-orphan")
+    # Loaded lazily: user lookups (every login) must not drag in score history.
+    # Query sites that need scores should use .options(selectinload(User.scores)).
+    # passive_deletes lets the database's ON DELETE CASCADE remove them
+    # (init_db adds it to tables created by older releases).
+    scores = relationship("Score", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
 
 
 class Score(Base):
     __tablename__ = "scores"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     score = Column(Integer, nullable=False, index=True)
-    mode = Column(SQLEnum(GameModeEnum), nullable=False, index=True)
-    timestamp = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    mode = Column(SmallInteger, nullable=False, index=True)  # GameModeEnum code
+    timestamp = Column(DateTime, server_default=utc_now(), nullable=False, index=True)
 
     # Relationship to user
     user = relationship("User", back_populates="scores")
 
+    __table_args__ = (
+        # Leaderboard: WHERE mode = ? ORDER BY score DESC, id LIMIT ? (and its ROW_NUMBER
+        # window) is read straight off the index; user_id is carried for the join on Postgres
+        Index("ix_scores_mode_score_id", mode, score.desc(), id, postgresql_include=["user_id"]),
+    )
+
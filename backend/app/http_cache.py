@@ -0,0 +1,31 @@
+"""
+HTTP conditional request helpers (ETag / If-None-Match)
+"""
+import hashlib
+from typing import Iterable, Optional
+from fastapi import Request, Response, status
+
+
+def scores_etag(scores: Iterable[dict]) -> str:
+    """
+    Build an ETag for a list of score rows.
+    Score rows never change once written, so their ids (in order) plus usernames
+    identify the response body without serializing it.
+    """
+    digest = hashlib.blake2b(digest_size=12)
+    for s in scores:
+        digest.update(f"{s['id']}:{s['username']};".encode())
+    return f'W/"{digest.hexdigest()}"'
+
+
+def not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    Tag the response with etag and return a 304 response if the client already has it.
+    Clients must revalidate (no-cache) so a new score is seen on the next poll.
+    """
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
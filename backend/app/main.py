@@ -1,11 +1,27 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from app import db_config
+from app.db_config import get_db
 from app.routers import auth, leaderboard, players
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Verify the database is reachable on startup; release pooled connections on shutdown"""
+    db_config.check_db_connection()
+    yield
+    db_config.dispose_engine()
+
+
 app = FastAPI(
     title="Snake Game API",
     description="RESTful API for the Snake Game multiplayer application",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse  # orjson's C encoder for all JSON responses
 )
 
 # CORS middleware
@@ -19,14 +35,22 @@ app.add_middleware(
         "https://snake-game.nabuminds-test.app"    # Alternative localhost format
     ],
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    # Explicit lists (everything the frontend sends) instead of "*" let
+    # browsers cache preflight responses for max_age seconds
+    allow_methods=["GET", "POST", "OPTIONS"],
+    allow_headers=["Authorization", "Content-Type"],
+    max_age=86400,
 )
 
+# Compress larger JSON bodies (e.g. a 100-row leaderboard); small responses skip it
+app.add_middleware(GZipMiddleware, minimum_size=500, compresslevel=5)
+
 # Include routers
-app.include_router(auth.router, prefix="/api/v1/auth", tags=["Authentication"])
-app.include_router(leaderboard.router, prefix="/api/v1", tags=["Leaderboard"])
-app.include_router(players.router, prefix="/api/v1/players", tags=["Players"])
+# Each API request gets one database session, shared by all db.* calls it makes
+request_session = [Depends(get_db)]
+app.include_router(auth.router, prefix="/api/v1/auth", tags=["Authentication"], dependencies=request_session)
+app.include_router(leaderboard.router, prefix="/api/v1", tags=["Leaderboard"], dependencies=request_session)
+app.include_router(players.router, prefix="/api/v1/players", tags=["Players"], dependencies=request_session)
 
 
 @app.get("/")
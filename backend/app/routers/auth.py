@@ -8,7 +8,7 @@ router = APIRouter()
 
 
 @router.post("/login", response_model=AuthResponse, status_code=status.HTTP_200_OK)
-async def login(login_request: LoginRequest):
+def login(login_request: LoginRequest):
     """User login endpoint"""
     user = db.get_user_by_email(login_request.email)
     
@@ -24,6 +24,10 @@ async def login(login_request: LoginRequest):
             detail="Invalid email or password"
         )
     
+    # Transparently upgrade legacy bcrypt (or outdated argon2) hashes
+    if db.password_needs_rehash(user["password_hash"]):
+        db.update_password_hash(user["id"], db.hash_password(login_request.password))
+    
     # Create access token
     access_token_expires = timedelta(minutes=30)
     access_token = create_access_token(
@@ -42,35 +46,27 @@ async def login(login_request: LoginRequest):
 
 
 @router.post("/signup", response_model=AuthResponse, status_code=status.HTTP_201_CREATED)
-async def signup(signup_request: SignupRequest):
+def signup(signup_request: SignupRequest):
     """User registration endpoint"""
-    # Check if email already exists
-    if db.email_exists(signup_request.email):
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="Email already exists"
-        )
-    
-    # Check if username already exists
-    if db.username_exists(signup_request.username):
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="Username already exists"
-        )
-    
-    # Create user
-    user_id = db.create_user(
+    # Insert unless email/username is taken: one round-trip on success
+    user = db.create_user_if_unique(
         username=signup_request.username,
         email=signup_request.email,
         password=signup_request.password
     )
     
-    user = db.get_user_by_id(user_id)
+    if user is None:
+        # Work out which unique field conflicted
+        detail = "Email already exists" if db.email_exists(signup_request.email) else "Username already exists"
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=detail
+        )
     
     # Create access token
     access_token_expires = timedelta(minutes=30)
     access_token = create_access_token(
-        data={"sub": str(user_id)}, expires_delta=access_token_expires
+        data={"sub": str(user["id"])}, expires_delta=access_token_expires
     )
     
     return AuthResponse(
@@ -93,7 +89,7 @@ async def logout():
 
 
 @router.get("/me", response_model=User, status_code=status.HTTP_200_OK)
-async def get_current_user(user_id: int = Depends(get_current_user_id)):
+def get_current_user(user_id: int = Depends(get_current_user_id)):
     """Get current authenticated user"""
     user = db.get_user_by_id(user_id)
     if not user:
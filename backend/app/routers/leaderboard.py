@@ -1,24 +1,34 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi import APIRouter, status, Depends, Query, Request, Response
 from typing import Optional
 from app.models import (
     ScoreSubmission, ScoreResponse, LeaderboardResponse, Score, GameMode
 )
 from app.database import db
 from app.auth import get_current_user_id
+from app.http_cache import not_modified, scores_etag
 
 router = APIRouter()
 
 
 @router.get("/leaderboard", response_model=LeaderboardResponse, status_code=status.HTTP_200_OK)
-async def get_leaderboard(
+def get_leaderboard(
+    request: Request,
+    response: Response,
     limit: Optional[int] = Query(default=10, ge=1, le=100),
     mode: Optional[GameMode] = None
 ):
     """Get leaderboard with optional limit and mode filter"""
     scores_data = db.get_scores(limit=limit, mode=mode)
     
+    # Polling clients that already hold this leaderboard get a bodiless 304
+    cached = not_modified(request, response, scores_etag(scores_data))
+    if cached is not None:
+        return cached
+    
+    # Rows come from our own database, so skip per-row validation here;
+    # the response is still checked against response_model once on the way out
     scores = [
-        Score(
+        Score.model_construct(
             id=s["id"],
             userId=s["userId"],
             username=s["username"],
@@ -30,30 +40,22 @@ async def get_leaderboard(
         for s in scores_data
     ]
     
-    return LeaderboardResponse(success=True, leaderboard=scores)
+    return LeaderboardResponse.model_construct(success=True, leaderboard=scores)
 
 
 @router.post("/scores", response_model=ScoreResponse, status_code=status.HTTP_201_CREATED)
-async def submit_score(
+def submit_score(
     score_submission: ScoreSubmission,
     user_id: int = Depends(get_current_user_id)
 ):
     """Submit a new game score"""
-    # Create score entry
-    score_id = db.create_score(
+    # Create score entry; the full row comes back from the insert
+    score_data = db.create_score(
         user_id=user_id,
         score=score_submission.score,
         mode=score_submission.mode
     )
     
-    # Get the created score with all details
-    score_data = db.get_score_by_id(score_id)
-    if not score_data:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to retrieve created score"
-        )
-    
     score = Score(
         id=score_data["id"],
         userId=score_data["userId"],
@@ -1,12 +1,13 @@
-from fastapi import APIRouter, status
+from fastapi import APIRouter, status, Request, Response
 from app.models import ActivePlayersResponse, ActivePlayer, GameMode
 from app.database import db
+from app.http_cache import not_modified, scores_etag
 
 router = APIRouter()
 
 
 @router.get("/active", response_model=ActivePlayersResponse, status_code=status.HTTP_200_OK)
-async def get_active_players():
+def get_active_players(request: Request, response: Response):
     """
     Get list of currently active players.
     Note: This is a mock implementation. In a real system, this would track
@@ -16,8 +17,13 @@ async def get_active_players():
     # For now, return top 3 players from recent scores
     recent_scores = db.get_scores(limit=3)
     
+    cached = not_modified(request, response, scores_etag(recent_scores))
+    if cached is not None:
+        return cached
+    
+    # Trusted database rows: skip per-row validation (response_model still applies)
     players = [
-        ActivePlayer(
+        ActivePlayer.model_construct(
             id=score["userId"],
             username=score["username"],
             score=score["score"],
@@ -26,5 +32,5 @@ async def get_active_players():
         for score in recent_scores
     ]
     
-    return ActivePlayersResponse(success=True, players=players)
+    return ActivePlayersResponse.model_construct(success=True, players=players)
 
@@ -4,74 +4,116 @@ Uses a real SQLite database (in-memory) for testing
 """
 import pytest
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
-from fastapi.testclient import TestClient
+from functools import lru_cache
 
-from app.db_models import Base
-from app.main import app
-from app.database import Database
-from app import database as database_module
-from app import db_config
+# Cheap password hashing for tests; must be set before app modules are imported
+os.environ.setdefault("ARGON2_TIME_COST", "1")
+os.environ.setdefault("ARGON2_MEMORY_COST", "8")
+# Keep the app's import-time engine off ./snake_game.db (and any real database):
+# every test process, including each xdist worker, gets its own private in-memory one
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
 
+# App and SQLAlchemy imports live inside the fixtures, so collection
+# (--collect-only, -k filtering) does not build the FastAPI app
 
-@pytest.fixture(scope="function")
-def clean_db():
-    """
-    Create an in-memory SQLite database for each test.
-    This ensures complete isolation between tests.
-    """
-    # Create in-memory SQLite database
-    test_db_url = "sqlite:///:memory:"
+
+@pytest.fixture(scope="session")
+def test_engine():
+    """Create the in-memory SQLite database and its schema once per session"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import StaticPool
+    from app.db_models import Base
     
-    # Create engine for test database
-    test_engine = create_engine(
-        test_db_url,
+    engine = create_engine(
+        "sqlite:///:memory:",
         connect_args={"check_same_thread": False},
         poolclass=StaticPool,
         echo=False,
     )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def test_database(test_engine):
+    """
+    Point the app at the test engine and create the Database instance once per
+    session; clean_db empties the tables between tests.
+    """
+    from sqlalchemy.orm import sessionmaker
+    from app.database import Database
+    from app import database as database_module
+    from app import db_config
     
-    # Create all tables
-    Base.metadata.create_all(bind=test_engine)
-    
-    # Save original engine and session
+    # Save original engine, session and db, then point everything at the test engine
     original_engine = db_config.engine
     original_session = db_config.SessionLocal
-    
-    # Replace with test engine
+    original_db = database_module.db
     db_config.engine = test_engine
-    db_config.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+    db_config.SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=test_engine)
+    database = Database(initialize_test_data=False)
+    database_module.db = database
     
-    # Create new database instance (it will use the test engine via db_config)
-    test_database = Database(initialize_test_data=False)
+    yield database
     
-    # Replace the global db instance
-    original_db = database_module.db
-    database_module.db = test_database
+    db_config.engine = original_engine
+    db_config.SessionLocal = original_session
+    database_module.db = original_db
+
+
+@pytest.fixture(scope="function")
+def clean_db(test_engine, test_database):
+    """
+    Give each test empty tables.
+    Rows are deleted rather than the schema being dropped and recreated.
+    """
+    from app.db_models import Base
+    
+    with test_engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+    test_database.clear_caches()
     
     yield test_database
     
-    # Cleanup: drop all tables
-    Base.metadata.drop_all(bind=test_engine)
-    test_engine.dispose()
+    test_database.clear_caches()
+
+
+@pytest.fixture(scope="session")
+def client():
+    """
+    One test client for the whole session; app startup/shutdown run once.
+    Per-test isolation comes from clean_db, not the client.
+    """
+    from fastapi.testclient import TestClient
+    from app.main import app
     
-    # Restore original database configuration
-    db_config.engine = original_engine
-    db_config.SessionLocal = original_session
-    database_module.db = original_db
+    with TestClient(app) as test_client:
+        yield test_client
 
 
 @pytest.fixture
-def client():
-    """Create a test client"""
-    return TestClient(app)
+def seeded_user(client, clean_db):
+    """Sign up a user with fixed credentials and return them with its token"""
+    user = {
+        "username": "seeduser",
+        "email": "seeduser@example.com",
+        "password": "password123",
+    }
+    response = client.post("/api/v1/auth/signup", json=user)
+    assert response.status_code == 201, f"Signup failed: {response.json()}"
+    data = response.json()
+    return {**user, "id": data["user"]["id"], "token": data["token"]}
 
 
 # Helper to ensure passwords are safe for bcrypt (<= 72 bytes)
+@lru_cache(maxsize=32)
 def safe_password(pwd: str) -> str:
     """Ensure password is <= 72 bytes for bcrypt"""
+    # ASCII is one byte per character, so no encoding is needed to check the length
+    if len(pwd) <= 72 and pwd.isascii():
+        return pwd
     pwd_bytes = pwd.encode('utf-8')
     if len(pwd_bytes) <= 72:
         return pwd
@@ -1,5 +1,5 @@
 import pytest
-from tests.conftest import safe_password, clean_db, client
+from tests.conftest import safe_password
 
 
 def test_root(client):
@@ -35,114 +35,59 @@ def test_signup_success(client, clean_db):
     assert data["token"] is not None
 
 
-def test_signup_duplicate_email(client, clean_db):
-    """Test signup with duplicate email"""
+@pytest.mark.parametrize("dup_field", ["email", "username"])
+def test_signup_duplicate(client, clean_db, dup_field):
+    """Test signup with a duplicate email or username"""
     # First signup
-    client.post(
-        "/api/v1/auth/signup",
-        json={
-            "username": "user1",
-            "email": "duplicate@example.com",
-            "password": safe_password("password123")
-        }
-    )
-    
-    # Try to signup with same email
-    response = client.post(
-        "/api/v1/auth/signup",
-        json={
-            "username": "user2",
-            "email": "duplicate@example.com",
-            "password": safe_password("password123")
-        }
-    )
-    assert response.status_code == 409
-    assert "already exists" in response.json()["detail"].lower()
-
-
-def test_signup_duplicate_username(client, clean_db):
-    """Test signup with duplicate username"""
-    # First signup
-    client.post(
-        "/api/v1/auth/signup",
-        json={
-            "username": "duplicate",
-            "email": "user1@example.com",
-            "password": safe_password("password123")
-        }
-    )
+    first = {
+        "username": "user1",
+        "email": "user1@example.com",
+        "password": safe_password("password123")
+    }
+    client.post("/api/v1/auth/signup", json=first)
     
-    # Try to signup with same username
-    response = client.post(
-        "/api/v1/auth/signup",
-        json={
-            "username": "duplicate",
-            "email": "user2@example.com",
-            "password": safe_password("password123")
-        }
-    )
+    # Try to signup again reusing one field
+    second = {
+        "username": "user2",
+        "email": "user2@example.com",
+        "password": safe_password("password123")
+    }
+    second[dup_field] = first[dup_field]
+    response = client.post("/api/v1/auth/signup", json=second)
     assert response.status_code == 409
     assert "already exists" in response.json()["detail"].lower()
 
 
-def test_login_success(client, clean_db):
+def test_login_success(client, seeded_user):
     """Test successful login"""
-    # First create a user
-    client.post(
-        "/api/v1/auth/signup",
-        json={
-            "username": "loginuser",
-            "email": "loginuser@example.com",
-            "password": safe_password("password123")
-        }
-    )
-    
-    # Login
     response = client.post(
         "/api/v1/auth/login",
         json={
-            "email": "loginuser@example.com",
-            "password": safe_password("password123")
+            "email": seeded_user["email"],
+            "password": seeded_user["password"]
         }
     )
     assert response.status_code == 200
     data = response.json()
     assert data["success"] is True
-    assert data["user"]["email"] == "loginuser@example.com"
+    assert data["user"]["email"] == seeded_user["email"]
     assert "token" in data
     assert data["token"] is not None
 
 
-def test_login_invalid_credentials(client, clean_db):
-    """Test login with invalid credentials"""
-    response = client.post(
-        "/api/v1/auth/login",
-        json={
-            "email": "nonexistent@example.com",
-            "password": safe_password("wrongpassword")
-        }
-    )
-    assert response.status_code == 401
-    assert "invalid" in response.json()["detail"].lower()
-
-
-def test_login_wrong_password(client, clean_db):
-    """Test login with wrong password"""
-    # Create user
-    client.post(
-        "/api/v1/auth/signup",
-        json={
-            "username": "wrongpass",
-            "email": "wrongpass@example.com",
-            "password": safe_password("correctpassword")
-        }
-    )
+@pytest.mark.parametrize("email,precreate", [
+    pytest.param("nonexistent@example.com", False, id="unknown-email"),
+    pytest.param("seeduser@example.com", True, id="wrong-password"),
+])
+def test_login_invalid_credentials(client, clean_db, request, email, precreate):
+    """Test login with an unknown email or a wrong password"""
+    if precreate:
+        request.getfixturevalue("seeded_user")
     
-    # Try login with wrong password
     response = client.post(
         "/api/v1/auth/login",
         json={
-            "email": "wrongpass@example.com",
+            "email": email,
             "password": safe_password("wrongpassword")
         }
     )
@@ -150,31 +95,16 @@ def test_login_wrong_password(client, clean_db):
     assert "invalid" in response.json()["detail"].lower()
 
 
-def test_get_current_user(client, clean_db):
+def test_get_current_user(client, seeded_user):
     """Test getting current user with valid token"""
-    # Signup and get token
-    signup_response = client.post(
-        "/api/v1/auth/signup",
-        json={
-            "username": "currentuser",
-            "email": "currentuser@example.com",
-            "password": safe_password("password123")
-        }
-    )
-    assert signup_response.status_code == 201, f"Signup failed: {signup_response.json()}"
-    signup_data = signup_response.json()
-    assert "token" in signup_data, f"Token not found in response: {signup_data}"
-    token = signup_data["token"]
-    
-    # Get current user
     response = client.get(
         "/api/v1/auth/me",
-        headers={"Authorization": f"Bearer {token}"}
+        headers={"Authorization": f"Bearer {seeded_user['token']}"}
     )
     assert response.status_code == 200
     data = response.json()
-    assert data["username"] == "currentuser"
-    assert data["email"] == "currentuser@example.com"
+    assert data["username"] == seeded_user["username"]
+    assert data["email"] == seeded_user["email"]
 
 
 def test_get_current_user_no_token(client, clean_db):
@@ -1,30 +1,11 @@
 import pytest
-import uuid
 from app.models import GameMode
-from tests.conftest import safe_password, clean_db, client
 
 
 @pytest.fixture
-def auth_token(client, clean_db):
-    """Create a user and return auth token and username"""
-    # Generate unique username and email for each test to avoid conflicts
-    unique_id = str(uuid.uuid4())[:8]
-    username = f"testplayer_{unique_id}"
-    email = f"testplayer_{unique_id}@example.com"
-    
-    response = client.post(
-        "/api/v1/auth/signup",
-        json={
-            "username": username,
-            "email": email,
-            "password": safe_password("password123")
-        }
-    )
-    assert response.status_code == 201, f"Signup failed with status {response.status_code}: {response.json()}"
-    data = response.json()
-    assert "token" in data, f"Token not found in response: {data}"
-    # Return both token and username for tests that need the username
-    return {"token": data["token"], "username": username}
+def auth_token(seeded_user):
+    """Token and username of the seeded user"""
+    return {"token": seeded_user["token"], "username": seeded_user["username"]}
 
 
 def test_get_leaderboard(client, clean_db):
@@ -100,41 +81,17 @@ def test_submit_score_negative(client, clean_db, auth_token):
     assert response.status_code == 422  # Validation error
 
 
-def test_leaderboard_ordering(client, clean_db, auth_token):
-    """Test that leaderboard is ordered by score descending"""
-    # Submit multiple scores
-    client.post(
-        "/api/v1/scores",
-        json={"score": 100, "mode": "wall"},
-        headers={"Authorization": f"Bearer {auth_token['token']}"}
-    )
-    client.post(
-        "/api/v1/scores",
-        json={"score": 300, "mode": "wall"},
-        headers={"Authorization": f"Bearer {auth_token['token']}"}
-    )
-    client.post(
-        "/api/v1/scores",
-        json={"score": 200, "mode": "wall"},
-        headers={"Authorization": f"Bearer {auth_token['token']}"}
-    )
+def test_leaderboard_ordering(client, clean_db, seeded_user):
+    """Test that leaderboard is ordered by score descending and ranked from 1"""
+    # Seed scores directly; submission itself is covered by test_submit_score
+    clean_db.bulk_create_scores([
+        {"user_id": seeded_user["id"], "score": score, "mode": GameMode.WALL}
+        for score in (100, 300, 200)
+    ])
     
     response = client.get("/api/v1/leaderboard?limit=10")
     assert response.status_code == 200
     scores = response.json()["leaderboard"]
     
-    # Check that scores are in descending order
-    for i in range(len(scores) - 1):
-        assert scores[i]["score"] >= scores[i + 1]["score"]
-
-
-def test_leaderboard_ranks(client, clean_db):
-    """Test that leaderboard includes rank numbers"""
-    response = client.get("/api/v1/leaderboard")
-    assert response.status_code == 200
-    scores = response.json()["leaderboard"]
-    
-    # Check that ranks are sequential starting from 1
-    for i, score in enumerate(scores, start=1):
-        assert score["rank"] == i
-
+    assert [s["score"] for s in scores] == [300, 200, 100]
+    assert [s["rank"] for s in scores] == [1, 2, 3]
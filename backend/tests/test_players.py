@@ -1,5 +1,4 @@
 import pytest
-from tests.conftest import clean_db, client
 
 
 def test_get_active_players(client, clean_db):
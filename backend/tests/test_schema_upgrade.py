@@ -0,0 +1,137 @@
+"""
+Tests for upgrading databases created by older releases
+"""
+import enum
+from datetime import datetime
+
+
+def _legacy_engine():
+    """In-memory database with the tables as older releases created them"""
+    from sqlalchemy import Column, DateTime, Enum, ForeignKey, Integer, MetaData, String, Table, create_engine
+    from sqlalchemy.pool import StaticPool
+    
+    class LegacyGameMode(enum.Enum):
+        WALL = "wall"
+        PASS = "pass"
+    
+    engine = create_engine("sqlite:///:memory:", poolclass=StaticPool)
+    metadata = MetaData()
+    users = Table(
+        "users", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("username", String(50), unique=True, nullable=False, index=True),
+        Column("email", String(255), unique=True, nullable=False, index=True),
+        Column("password_hash", String(255), nullable=False),
+        Column("created_at", DateTime, nullable=False),
+    )
+    scores = Table(
+        "scores", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("user_id", Integer, ForeignKey("users.id"), nullable=False, index=True),
+        Column("score", Integer, nullable=False, index=True),
+        Column("mode", Enum(LegacyGameMode), nullable=False, index=True),
+        Column("timestamp", DateTime, nullable=False, index=True),
+    )
+    metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(users.insert(), [
+            {"id": 1, "username": "legacy", "email": "legacy@example.com",
+             "password_hash": "x", "created_at": datetime(2024, 1, 1)},
+            {"id": 2, "username": "other", "email": "other@example.com",
+             "password_hash": "x", "created_at": datetime(2024, 1, 1)},
+        ])
+        conn.execute(scores.insert(), [
+            {"id": 1, "user_id": 1, "score": 50, "mode": LegacyGameMode.WALL, "timestamp": datetime(2024, 1, 1)},
+            {"id": 2, "user_id": 1, "score": 70, "mode": LegacyGameMode.PASS, "timestamp": datetime(2024, 1, 2)},
+            {"id": 3, "user_id": 2, "score": 10, "mode": LegacyGameMode.WALL, "timestamp": datetime(2024, 1, 3)},
+        ])
+    return engine
+
+
+def test_upgrade_adds_on_delete_cascade():
+    """Test that deleting a user removes their scores once the upgrade has run"""
+    from sqlalchemy import inspect, text
+    from app.db_config import upgrade_schema
+    
+    engine = _legacy_engine()
+    upgrade_schema(engine)
+    
+    (foreign_key,) = inspect(engine).get_foreign_keys("scores")
+    assert foreign_key["referred_table"] == "users"
+    assert foreign_key["options"]["ondelete"] == "CASCADE"
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+        conn.execute(text("DELETE FROM users WHERE id = 1"))
+        conn.commit()
+        assert conn.execute(text("SELECT id FROM scores")).scalars().all() == [3]
+    engine.dispose()
+
+
+def test_upgrade_adds_timestamp_server_defaults():
+    """Test that rows inserted without created_at/timestamp are stamped by the database"""
+    from sqlalchemy import text
+    from app.db_config import upgrade_schema
+    
+    engine = _legacy_engine()
+    upgrade_schema(engine)
+    
+    with engine.connect() as conn:
+        conn.execute(text(
+            "INSERT INTO users (id, username, email, password_hash) VALUES (3, 'new', 'new@example.com', 'x')"
+        ))
+        conn.execute(text("INSERT INTO scores (id, user_id, score, mode) VALUES (4, 3, 20, 0)"))
+        conn.commit()
+        assert conn.execute(text("SELECT created_at FROM users WHERE id = 3")).scalar() is not None
+        assert conn.execute(text("SELECT timestamp FROM scores WHERE id = 4")).scalar() is not None
+    engine.dispose()
+
+
+def test_upgrade_converts_legacy_mode_names_to_codes():
+    """Test that 'WALL'/'PASS' rows become GameModeEnum codes"""
+    from sqlalchemy import Integer, inspect, text
+    from app.db_config import upgrade_schema
+    from app.db_models import GameModeEnum
+    
+    engine = _legacy_engine()
+    upgrade_schema(engine)
+    
+    mode_column = next(col for col in inspect(engine).get_columns("scores") if col["name"] == "mode")
+    assert isinstance(mode_column["type"], Integer)
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT mode FROM scores ORDER BY id")).scalars().all() == [
+            GameModeEnum.WALL, GameModeEnum.PASS, GameModeEnum.WALL
+        ]
+    engine.dispose()
+
+
+def test_upgrade_keeps_rows_and_adds_indexes():
+    """Test that the rebuilt tables keep their rows and gain the current indexes"""
+    from sqlalchemy import inspect, text
+    from app.db_config import upgrade_schema
+    
+    engine = _legacy_engine()
+    upgrade_schema(engine)
+    
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT id, user_id, score FROM scores ORDER BY id")).all() == [
+            (1, 1, 50), (2, 1, 70), (3, 2, 10)
+        ]
+        assert conn.execute(text("SELECT username, created_at FROM users ORDER BY id")).all() == [
+            ("legacy", "2024-01-01 00:00:00.000000"), ("other", "2024-01-01 00:00:00.000000")
+        ]
+    assert "ix_scores_mode_score_id" in {index["name"] for index in inspect(engine).get_indexes("scores")}
+    engine.dispose()
+
+
+def test_upgrade_is_idempotent():
+    """Test that running the upgrade on an upgraded database changes nothing"""
+    from sqlalchemy import text
+    from app.db_config import upgrade_schema
+    
+    engine = _legacy_engine()
+    upgrade_schema(engine)
+    upgrade_schema(engine)
+    
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT id, mode FROM scores ORDER BY id")).all() == [(1, 0), (2, 1), (3, 0)]
+    engine.dispose()
@@ -4,106 +4,160 @@ Uses a real SQLite database (in-memory) for testing
 """
 import pytest
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
-from fastapi.testclient import TestClient
 
-from app.db_models import Base
-from app.main import app
-from app.database import Database
-from app import database as database_module
-from app import db_config
+# Cheap password hashing for tests; must be set before app modules are imported
+os.environ.setdefault("ARGON2_TIME_COST", "1")
+os.environ.setdefault("ARGON2_MEMORY_COST", "8")
+# Keep the app's import-time engine off ./snake_game.db (and any real database):
+# every test process, including each xdist worker, gets its own private in-memory one
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
 
+# App and SQLAlchemy imports live inside the fixtures, so collection
+# (--collect-only, -k filtering) does not build the FastAPI app
 
-@pytest.fixture(scope="function")
-def test_db():
+
+@pytest.fixture(scope="session")
+def test_engine():
     """
-    Create an in-memory SQLite database for each test.
-    This ensures complete isolation between tests.
+    Create the in-memory SQLite database and its schema once per session.
+    Tests are isolated by test_db rolling back their transaction instead.
     """
-    # Create in-memory SQLite database
-    test_db_url = "sqlite:///:memory:"
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.pool import StaticPool
+    from app.db_models import Base
+    from app import db_config
     
-    # Create engine for test database
-    test_engine = create_engine(
-        test_db_url,
+    engine = create_engine(
+        "sqlite:///:memory:",
         connect_args={"check_same_thread": False},
         poolclass=StaticPool,
         echo=False,
     )
     
-    # Create all tables
-    Base.metadata.create_all(bind=test_engine)
+    # pysqlite starts transactions lazily and not before SAVEPOINT, so a released
+    # savepoint would commit; take over BEGIN so SAVEPOINTs nest inside it
+    @event.listens_for(engine, "connect")
+    def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+    
+    @event.listens_for(engine, "begin")
+    def _emit_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+    
+    Base.metadata.create_all(bind=engine)
     
-    # Save original engine and session
     original_engine = db_config.engine
-    original_session = db_config.SessionLocal
+    db_config.engine = engine
     
-    # Replace with test engine
-    db_config.engine = test_engine
-    db_config.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+    yield engine
+    
+    db_config.engine = original_engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def session_database(test_engine):
+    """The Database instance used for the whole session"""
+    from app.database import Database
+    from app import database as database_module
     
-    # Create new database instance (it will use the test engine via db_config)
     test_database = Database(initialize_test_data=False)
     
-    # Replace the global db instance
     original_db = database_module.db
     database_module.db = test_database
     
     yield test_database
     
-    # Cleanup: drop all tables
-    Base.metadata.drop_all(bind=test_engine)
-    test_engine.dispose()
+    database_module.db = original_db
+
+
+@pytest.fixture(scope="session")
+def session_user(test_engine, session_database):
+    """
+    Create the shared test user once, committed outside any per-test transaction,
+    so it survives every test_db rollback.
+    """
+    from sqlalchemy.orm import sessionmaker
+    from app import db_config
+    from app.auth import create_access_token
+    
+    original_session = db_config.SessionLocal
+    db_config.SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=test_engine)
+    try:
+        user_id = session_database.create_user("testuser", "testuser@example.com", "password123")
+    finally:
+        db_config.SessionLocal = original_session
+    session_database.clear_caches()
+    
+    return {
+        "id": user_id,
+        "username": "testuser",
+        "email": "testuser@example.com",
+        "token": create_access_token(data={"sub": str(user_id)})
+    }
+
+
+@pytest.fixture(scope="function")
+def test_db(test_engine, session_database):
+    """
+    Run each test inside a transaction that is rolled back afterwards.
+    Sessions join it through a SAVEPOINT, so their commits only release the
+    savepoint and nothing outlives the test.
+    """
+    from sqlalchemy.orm import sessionmaker
+    from app import db_config
+    
+    connection = test_engine.connect()
+    transaction = connection.begin()
+    
+    original_session = db_config.SessionLocal
+    db_config.SessionLocal = sessionmaker(
+        autocommit=False, autoflush=False, expire_on_commit=False,
+        bind=connection, join_transaction_mode="create_savepoint",
+    )
+    # Rolled-back ids get reused, so cached rows must not outlive a test
+    session_database.clear_caches()
+    
+    yield session_database
     
-    # Restore original database configuration
-    db_config.engine = original_engine
     db_config.SessionLocal = original_session
-    database_module.db = original_db
+    transaction.rollback()
+    connection.close()
+    session_database.clear_caches()
 
 
 @pytest.fixture
-def client(test_db):
-    """Create a test client with the test database"""
-    return TestClient(app)
+async def client(test_db):
+    """
+    Async client that calls the app in-process over ASGI, on the test's event loop.
+    No lifespan runs: the test database is already set up by test_db.
+    """
+    import httpx
+    from app.main import app
+    
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as async_client:
+        yield async_client
 
 
 @pytest.fixture
-def auth_token(client):
-    """Create a test user and return auth token"""
-    # Create a test user
-    response = client.post(
-        "/api/v1/auth/signup",
-        json={
-            "username": "testuser",
-            "email": "testuser@example.com",
-            "password": "password123"
-        }
-    )
-    assert response.status_code == 201
-    data = response.json()
-    assert "token" in data
-    return data["token"]
+def auth_token(test_db, session_user):
+    """Auth token of the shared test user"""
+    return session_user["token"]
 
 
 @pytest.fixture
-def auth_user(client):
-    """Create a test user and return user info and token"""
-    response = client.post(
-        "/api/v1/auth/signup",
-        json={
-            "username": "testuser",
-            "email": "testuser@example.com",
-            "password": "password123"
-        }
-    )
-    assert response.status_code == 201
-    data = response.json()
-    return {
-        "id": data["user"]["id"],
-        "username": data["user"]["username"],
-        "email": data["user"]["email"],
-        "token": data["token"]
-    }
+def auth_user(test_db, session_user):
+    """User info and token of the shared test user"""
+    return dict(session_user)
 
+
+@pytest.fixture
+def seed_scores(auth_user, test_db):
+    """Return a helper that inserts (score, mode) pairs for auth_user in one batch"""
+    def seed(scores):
+        test_db.bulk_create_scores([
+            {"user_id": auth_user["id"], "score": score, "mode": mode}
+            for score, mode in scores
+        ])
+    return seed
@@ -6,9 +6,9 @@ import pytest
 from fastapi import status
 
 
-def test_signup_creates_user_in_database(client, test_db):
+async def test_signup_creates_user_in_database(client, test_db):
     """Test that signup creates a user in the database"""
-    response = client.post(
+    response = await client.post(
         "/api/v1/auth/signup",
         json={
             "username": "newuser",
@@ -32,10 +32,10 @@ def test_signup_creates_user_in_database(client, test_db):
     assert "password_hash" in user
 
 
-def test_login_authenticates_existing_user(client, test_db):
+async def test_login_authenticates_existing_user(client, test_db):
     """Test that login works with a user in the database"""
     # First create a user
-    signup_response = client.post(
+    signup_response = await client.post(
         "/api/v1/auth/signup",
         json={
             "username": "loginuser",
@@ -46,7 +46,7 @@ def test_login_authenticates_existing_user(client, test_db):
     assert signup_response.status_code == status.HTTP_201_CREATED
     
     # Now login
-    login_response = client.post(
+    login_response = await client.post(
         "/api/v1/auth/login",
         json={
             "email": "loginuser@example.com",
@@ -62,10 +62,10 @@ def test_login_authenticates_existing_user(client, test_db):
     assert data["token"] is not None
 
 
-def test_login_fails_with_wrong_password(client, test_db):
+async def test_login_fails_with_wrong_password(client, test_db):
     """Test that login fails with incorrect password"""
     # Create user
-    client.post(
+    await client.post(
         "/api/v1/auth/signup",
         json={
             "username": "wrongpass",
@@ -75,7 +75,7 @@ def test_login_fails_with_wrong_password(client, test_db):
     )
     
     # Try login with wrong password
-    response = client.post(
+    response = await client.post(
         "/api/v1/auth/login",
         json={
             "email": "wrongpass@example.com",
@@ -87,9 +87,9 @@ def test_login_fails_with_wrong_password(client, test_db):
     assert "invalid" in response.json()["detail"].lower()
 
 
-def test_get_current_user_returns_database_user(client, auth_token):
+async def test_get_current_user_returns_database_user(client, auth_token):
     """Test that /me endpoint returns the user from database"""
-    response = client.get(
+    response = await client.get(
         "/api/v1/auth/me",
         headers={"Authorization": f"Bearer {auth_token}"}
     )
@@ -101,10 +101,10 @@ def test_get_current_user_returns_database_user(client, auth_token):
     assert "id" in data
 
 
-def test_duplicate_email_signup_fails(client, test_db):
+async def test_duplicate_email_signup_fails(client, test_db):
     """Test that signup with duplicate email fails and doesn't create duplicate"""
     # First signup
-    response1 = client.post(
+    response1 = await client.post(
         "/api/v1/auth/signup",
         json={
             "username": "user1",
@@ -115,7 +115,7 @@ def test_duplicate_email_signup_fails(client, test_db):
     assert response1.status_code == status.HTTP_201_CREATED
     
     # Try to signup with same email
-    response2 = client.post(
+    response2 = await client.post(
         "/api/v1/auth/signup",
         json={
             "username": "user2",
@@ -132,10 +132,10 @@ def test_duplicate_email_signup_fails(client, test_db):
     assert user["username"] == "user1"  # First user, not second
 
 
-def test_duplicate_username_signup_fails(client, test_db):
+async def test_duplicate_username_signup_fails(client, test_db):
     """Test that signup with duplicate username fails"""
     # First signup
-    response1 = client.post(
+    response1 = await client.post(
         "/api/v1/auth/signup",
         json={
             "username": "duplicate",
@@ -146,7 +146,7 @@ def test_duplicate_username_signup_fails(client, test_db):
     assert response1.status_code == status.HTTP_201_CREATED
     
     # Try to signup with same username
-    response2 = client.post(
+    response2 = await client.post(
         "/api/v1/auth/signup",
         json={
             "username": "duplicate",
@@ -158,10 +158,10 @@ def test_duplicate_username_signup_fails(client, test_db):
     assert response2.status_code == status.HTTP_409_CONFLICT
 
 
-def test_password_is_hashed_in_database(client, test_db):
+async def test_password_is_hashed_in_database(client, test_db):
     """Test that passwords are stored as hashes, not plaintext"""
     password = "password123"
-    response = client.post(
+    response = await client.post(
         "/api/v1/auth/signup",
         json={
             "username": "hashtest",
@@ -183,9 +183,104 @@ def test_password_is_hashed_in_database(client, test_db):
     assert test_db.verify_password(password, user["password_hash"])
 
 
-def test_logout_endpoint(client):
+async def test_logout_endpoint(client):
     """Test logout endpoint"""
-    response = client.post("/api/v1/auth/logout")
+    response = await client.post("/api/v1/auth/logout")
     assert response.status_code == status.HTTP_200_OK
     assert response.json() == {"success": True}
 
+
+def _baseline_bcrypt_input(password: str) -> bytes:
+    """What older releases fed to bcrypt: anything over 70 bytes cut back to a character boundary"""
+    password_bytes = password.encode("utf-8")
+    if len(password_bytes) > 70:
+        password_bytes = password_bytes[:70]
+        while password_bytes and (password_bytes[-1] & 0b11000000) == 0b10000000:
+            password_bytes = password_bytes[:-1]
+        password_bytes = password_bytes.decode("utf-8", errors="ignore").encode("utf-8")
+    return password_bytes
+
+
+@pytest.mark.parametrize("password", [
+    pytest.param("a" * 70, id="70-bytes"),
+    pytest.param("a" * 71, id="71-bytes"),
+    pytest.param("a" * 72, id="72-bytes"),
+    pytest.param("a" * 80, id="80-bytes"),
+    pytest.param("é" * 36, id="72-bytes-multibyte"),
+    pytest.param("a" + "é" * 40, id="81-bytes-multibyte"),
+])
+def test_verify_password_accepts_legacy_bcrypt_hashes(test_db, password):
+    """Test that bcrypt hashes produced by older releases still verify"""
+    import bcrypt
+    
+    legacy_hash = bcrypt.hashpw(_baseline_bcrypt_input(password), bcrypt.gensalt(rounds=4)).decode("utf-8")
+    
+    assert test_db.verify_password(password, legacy_hash)
+
+
+async def test_cached_user_lookup_returns_independent_copies(client, auth_user, test_db):
+    """Test that cached user lookups can't be mutated through returned dicts"""
+    user = test_db.get_user_by_id(auth_user["id"])
+    user["username"] = "changed"
+    
+    assert test_db.get_user_by_id(auth_user["id"])["username"] == auth_user["username"]
+    assert test_db.get_user_by_username(auth_user["username"])["id"] == auth_user["id"]
+
+
+async def test_login_upgrades_legacy_bcrypt_hash(client, test_db):
+    """Test that a user with a bcrypt hash can log in and is rehashed to argon2id"""
+    import bcrypt
+    
+    legacy_hash = bcrypt.hashpw(b"password123", bcrypt.gensalt(rounds=4)).decode("utf-8")
+    test_db.create_user("legacy", "legacy@example.com", "", password_hash=legacy_hash)
+    
+    response = await client.post(
+        "/api/v1/auth/login",
+        json={
+            "email": "legacy@example.com",
+            "password": "password123"
+        }
+    )
+    assert response.status_code == status.HTTP_200_OK
+    
+    user = test_db.get_user_by_email("legacy@example.com")
+    assert user["password_hash"].startswith("$argon2id$")
+    assert test_db.verify_password("password123", user["password_hash"])
+
+
+@pytest.mark.parametrize("password_hash", [
+    pytest.param("$argon2id$garbage", id="argon2-unparseable"),
+    pytest.param("$argon2id$v=19$m=8,t=1,p=1$c2FsdHNhbHQ$aGFzaA", id="argon2-truncated-digest"),
+    pytest.param("$argon2", id="argon2-prefix-only"),
+    pytest.param("notahash", id="not-a-hash"),
+    pytest.param("", id="empty"),
+])
+def test_verify_password_rejects_malformed_hashes(test_db, password_hash):
+    """Test that a corrupt stored hash fails verification instead of raising"""
+    assert test_db.verify_password("password123", password_hash) is False
+
+
+async def test_signup_uses_one_session_for_the_whole_request(client, test_db, monkeypatch):
+    """Test that every database call made while handling a request shares the request's session"""
+    from app import db_config
+    
+    session_factory = db_config.SessionLocal
+    sessions = []
+    
+    def counting_session_factory():
+        session = session_factory()
+        sessions.append(session)
+        return session
+    
+    monkeypatch.setattr(db_config, "SessionLocal", counting_session_factory)
+    response = await client.post(
+        "/api/v1/auth/signup",
+        json={
+            "username": "onesession",
+            "email": "onesession@example.com",
+            "password": "password123"
+        }
+    )
+    
+    assert response.status_code == status.HTTP_201_CREATED
+    assert len(sessions) == 1
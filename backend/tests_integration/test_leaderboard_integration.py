@@ -3,14 +3,13 @@ Integration tests for leaderboard endpoints
 Tests the full flow: API -> Database -> Response
 """
 import pytest
-import time
 from fastapi import status
 from app.models import GameMode
 
 
-def test_submit_score_creates_entry_in_database(client, auth_token, test_db):
+async def test_submit_score_creates_entry_in_database(client, auth_token, test_db):
     """Test that submitting a score creates an entry in the database"""
-    response = client.post(
+    response = await client.post(
         "/api/v1/scores",
         headers={"Authorization": f"Bearer {auth_token}"},
         json={
@@ -34,26 +33,12 @@ def test_submit_score_creates_entry_in_database(client, auth_token, test_db):
     assert scores[0]["mode"] == "wall"
 
 
-def test_get_leaderboard_returns_scores_from_database(client, auth_user, test_db):
+async def test_get_leaderboard_returns_scores_from_database(client, seed_scores):
     """Test that leaderboard returns scores from database"""
-    # Submit multiple scores
-    scores_to_submit = [
-        {"score": 150, "mode": "wall"},
-        {"score": 200, "mode": "pass"},
-        {"score": 100, "mode": "wall"},
-    ]
-    
-    for score_data in scores_to_submit:
-        response = client.post(
-            "/api/v1/scores",
-            headers={"Authorization": f"Bearer {auth_user['token']}"},
-            json=score_data
-        )
-        assert response.status_code == status.HTTP_201_CREATED
-        time.sleep(0.01)  # Small delay to ensure different timestamps
+    seed_scores([(150, GameMode.WALL), (200, GameMode.PASS), (100, GameMode.WALL)])
     
     # Get leaderboard
-    response = client.get("/api/v1/leaderboard")
+    response = await client.get("/api/v1/leaderboard")
     assert response.status_code == status.HTTP_200_OK
     data = response.json()
     assert data["success"] is True
@@ -65,58 +50,44 @@ def test_get_leaderboard_returns_scores_from_database(client, auth_user, test_db
     assert scores[1]["score"] >= scores[2]["score"]
 
 
-def test_leaderboard_respects_limit(client, auth_user, test_db):
+async def test_leaderboard_respects_limit(client, seed_scores):
     """Test that leaderboard limit parameter works"""
-    # Submit 5 scores
-    for i in range(5):
-        response = client.post(
-            "/api/v1/scores",
-            headers={"Authorization": f"Bearer {auth_user['token']}"},
-            json={"score": 100 + i * 10, "mode": "wall"}
-        )
-        assert response.status_code == status.HTTP_201_CREATED
-        time.sleep(0.01)
+    # Seed 5 scores
+    seed_scores([(100 + i * 10, GameMode.WALL) for i in range(5)])
     
     # Get leaderboard with limit=3
-    response = client.get("/api/v1/leaderboard?limit=3")
+    response = await client.get("/api/v1/leaderboard?limit=3")
     assert response.status_code == status.HTTP_200_OK
     data = response.json()
     assert len(data["leaderboard"]) == 3
 
 
-def test_leaderboard_filters_by_mode(client, auth_user, test_db):
+async def test_leaderboard_filters_by_mode(client, seed_scores):
     """Test that leaderboard can filter by game mode"""
-    # Submit scores for both modes
-    wall_scores = [{"score": 150, "mode": "wall"}, {"score": 200, "mode": "wall"}]
-    pass_scores = [{"score": 100, "mode": "pass"}, {"score": 120, "mode": "pass"}]
-    
-    for score_data in wall_scores + pass_scores:
-        response = client.post(
-            "/api/v1/scores",
-            headers={"Authorization": f"Bearer {auth_user['token']}"},
-            json=score_data
-        )
-        assert response.status_code == status.HTTP_201_CREATED
-        time.sleep(0.01)
+    # Seed scores for both modes
+    seed_scores([
+        (150, GameMode.WALL), (200, GameMode.WALL),
+        (100, GameMode.PASS), (120, GameMode.PASS),
+    ])
     
     # Get leaderboard filtered by wall mode
-    response = client.get("/api/v1/leaderboard?mode=wall")
+    response = await client.get("/api/v1/leaderboard?mode=wall")
     assert response.status_code == status.HTTP_200_OK
     data = response.json()
     assert len(data["leaderboard"]) == 2
     assert all(score["mode"] == "wall" for score in data["leaderboard"])
     
     # Get leaderboard filtered by pass mode
-    response = client.get("/api/v1/leaderboard?mode=pass")
+    response = await client.get("/api/v1/leaderboard?mode=pass")
     assert response.status_code == status.HTTP_200_OK
     data = response.json()
     assert len(data["leaderboard"]) == 2
     assert all(score["mode"] == "pass" for score in data["leaderboard"])
 
 
-def test_submit_score_requires_authentication(client, test_db):
+async def test_submit_score_requires_authentication(client, test_db):
     """Test that submitting a score requires authentication"""
-    response = client.post(
+    response = await client.post(
         "/api/v1/scores",
         json={
             "score": 100,
@@ -127,9 +98,9 @@ def test_submit_score_requires_authentication(client, test_db):
     assert response.status_code == status.HTTP_403_FORBIDDEN
 
 
-def test_submit_score_includes_username(client, auth_user, test_db):
+async def test_submit_score_includes_username(client, auth_user, test_db):
     """Test that submitted score includes the username"""
-    response = client.post(
+    response = await client.post(
         "/api/v1/scores",
         headers={"Authorization": f"Bearer {auth_user['token']}"},
         json={
@@ -144,10 +115,10 @@ def test_submit_score_includes_username(client, auth_user, test_db):
     assert data["score"]["userId"] == auth_user["id"]
 
 
-def test_multiple_users_leaderboard(client, test_db):
+async def test_multiple_users_leaderboard(client, test_db):
     """Test leaderboard with scores from multiple users"""
     # Create first user and submit score
-    user1_response = client.post(
+    user1_response = await client.post(
         "/api/v1/auth/signup",
         json={
             "username": "player1",
@@ -157,14 +128,14 @@ def test_multiple_users_leaderboard(client, test_db):
     )
     user1_token = user1_response.json()["token"]
     
-    client.post(
+    await client.post(
         "/api/v1/scores",
         headers={"Authorization": f"Bearer {user1_token}"},
         json={"score": 300, "mode": "wall"}
     )
     
     # Create second user and submit score
-    user2_response = client.post(
+    user2_response = await client.post(
         "/api/v1/auth/signup",
         json={
             "username": "player2",
@@ -174,14 +145,14 @@ def test_multiple_users_leaderboard(client, test_db):
     )
     user2_token = user2_response.json()["token"]
     
-    client.post(
+    await client.post(
         "/api/v1/scores",
         headers={"Authorization": f"Bearer {user2_token}"},
         json={"score": 250, "mode": "wall"}
     )
     
     # Get leaderboard
-    response = client.get("/api/v1/leaderboard")
+    response = await client.get("/api/v1/leaderboard")
     assert response.status_code == status.HTTP_200_OK
     data = response.json()
     assert len(data["leaderboard"]) == 2
@@ -196,14 +167,14 @@ def test_multiple_users_leaderboard(client, test_db):
     assert data["leaderboard"][0]["username"] == "player1"
 
 
-def test_score_timestamp_is_set(client, auth_token, test_db):
+async def test_score_timestamp_is_set(client, auth_token, test_db):
     """Test that score timestamp is automatically set"""
-    from datetime import datetime
+    from datetime import datetime, timezone
     
     # Use UTC time to match database
-    before_time = int(datetime.utcnow().timestamp() * 1000)
+    before_time = int(datetime.now(timezone.utc).timestamp() * 1000)
     
-    response = client.post(
+    response = await client.post(
         "/api/v1/scores",
         headers={"Authorization": f"Bearer {auth_token}"},
         json={
@@ -212,7 +183,7 @@ def test_score_timestamp_is_set(client, auth_token, test_db):
         }
     )
     
-    after_time = int(datetime.utcnow().timestamp() * 1000)
+    after_time = int(datetime.now(timezone.utc).timestamp() * 1000)
     
     assert response.status_code == status.HTTP_201_CREATED
     data = response.json()
@@ -222,3 +193,61 @@ def test_score_timestamp_is_set(client, auth_token, test_db):
     assert before_time <= timestamp <= after_time + 1000  # Allow 1 second margin
     assert timestamp > 0  # Ensure timestamp is set
 
+
+async def test_bulk_create_scores_appear_on_leaderboard(client, auth_user, test_db):
+    """Test that scores inserted in bulk are returned by the leaderboard"""
+    test_db.bulk_create_scores([
+        {"user_id": auth_user["id"], "score": 50, "mode": GameMode.WALL},
+        {"user_id": auth_user["id"], "score": 75, "mode": GameMode.PASS},
+        {"user_id": auth_user["id"], "score": 60, "mode": GameMode.WALL},
+    ])
+    
+    response = await client.get("/api/v1/leaderboard")
+    assert response.status_code == status.HTTP_200_OK
+    scores = response.json()["leaderboard"]
+    assert [s["score"] for s in scores] == [75, 60, 50]
+    assert all(s["username"] == auth_user["username"] for s in scores)
+
+
+async def test_leaderboard_etag_returns_not_modified_until_scores_change(client, seed_scores):
+    """Test that a matching If-None-Match gets a 304 until the leaderboard changes"""
+    seed_scores([(100, GameMode.WALL)])
+    
+    response = await client.get("/api/v1/leaderboard")
+    assert response.status_code == status.HTTP_200_OK
+    etag = response.headers["etag"]
+    
+    response = await client.get("/api/v1/leaderboard", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.content == b""
+    
+    seed_scores([(200, GameMode.PASS)])
+    response = await client.get("/api/v1/leaderboard", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["etag"] != etag
+    assert len(response.json()["leaderboard"]) == 2
+
+
+async def test_submitted_score_shows_up_on_cached_leaderboard(client, auth_token, seed_scores):
+    """Test that submitting a score invalidates the cached leaderboard page"""
+    seed_scores([(100, GameMode.WALL)])
+    
+    # Populate the cache
+    response = await client.get("/api/v1/leaderboard")
+    assert response.status_code == status.HTTP_200_OK
+    assert [entry["score"] for entry in response.json()["leaderboard"]] == [100]
+    
+    response = await client.post(
+        "/api/v1/scores",
+        headers={"Authorization": f"Bearer {auth_token}"},
+        json={
+            "score": 250,
+            "mode": "wall"
+        }
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    
+    # Well within the cache TTL
+    response = await client.get("/api/v1/leaderboard")
+    assert response.status_code == status.HTTP_200_OK
+    assert [entry["score"] for entry in response.json()["leaderboard"]] == [250, 100]
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Wait for PostgreSQL database to be ready
+"""
+import os
+import random
+import socket
+import sys
+import time
+from urllib.parse import unquote, urlparse
+import psycopg2
+from psycopg2 import OperationalError
+
+def _port_open(host, port, timeout=0.3):
+    """Cheap readiness pre-check: does anything accept TCP connections on host:port?"""
+    try:
+        sock = socket.create_connection((host, port), timeout=timeout)
+    except OSError:
+        return False
+    sock.close()
+    return True
+
+def wait_for_db(host, port, user, password, database, timeout=60, initial_delay=0.1, max_delay=2.0):
+    """
+    Wait for database to be ready.
+    Retries back off exponentially from initial_delay up to max_delay (plus jitter),
+    so a database that comes up quickly is noticed quickly; gives up after timeout seconds.
+    """
+    deadline = time.monotonic() + timeout
+    attempt = 0
+    while True:
+        attempt += 1
+        # Skip the libpq handshake while the port is still closed;
+        # the connect below remains the real readiness check. No host (or a
+        # directory) means libpq uses a Unix socket, which a TCP probe cannot see
+        if not host or host.startswith("/") or _port_open(host, port):
+            try:
+                conn = psycopg2.connect(
+                    host=host,
+                    port=port,
+                    user=user,
+                    password=password,
+                    database=database,
+                    connect_timeout=2  # a hung handshake must not eat the whole deadline
+                )
+                conn.close()
+                print("Database is ready!")
+                return True
+            except OperationalError:
+                pass
+        
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        # Progress goes to stderr, and only for the first few attempts and every fifth after
+        if attempt <= 3 or attempt % 5 == 0:
+            sys.stderr.write(f"Waiting for database... (attempt {attempt}, {remaining:.0f}s left)\n")
+        sleep_for = min(max_delay, initial_delay * (2 ** (attempt - 1))) + random.uniform(0, 0.5)
+        time.sleep(min(sleep_for, remaining))
+    
+    sys.stderr.write(f"Database is not ready after {timeout}s\n")
+    return False
+
+def main():
+    """Read connection details from the environment and wait; exit 1 if the database never comes up"""
+    # Get database connection details from environment variables
+    # Support both individual variables and DATABASE_URL for backward compatibility
+    if os.getenv("DATABASE_URL"):
+        # Parse DATABASE_URL if provided (credentials may be percent-encoded)
+        url = urlparse(os.getenv("DATABASE_URL"))
+        try:
+            port = url.port or 5432
+        except ValueError:  # non-numeric or out-of-range port
+            port = None
+        if not url.hostname or port is None:
+            sys.stderr.write("Invalid DATABASE_URL format\n")
+            sys.exit(1)
+        
+        user = unquote(url.username or "")
+        password = unquote(url.password or "")
+        host = url.hostname
+        database = url.path.lstrip("/")
+    else:
+        # Use individual environment variables
+        user = os.getenv("POSTGRES_USER")
+        password = os.getenv("POSTGRES_PASSWORD")
+        host = os.getenv("POSTGRES_HOST")
+        port = int(os.getenv("POSTGRES_PORT", os.getenv("DB_PORT", "5432")))
+        database = os.getenv("POSTGRES_DB")
+    
+    if not wait_for_db(host, port, user, password, database):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()